@@ -4,6 +4,9 @@ from datetime import datetime
 from time import sleep
 from datetime import datetime, timedelta
 import socket
+import heapq
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 
 import xbmc
 import xbmcvfs
@@ -14,6 +17,51 @@ from bossanova808.notify import Notify
 from resources.lib.store import Store
 from resources.lib.clean import *
 
+# Approximate number of bytes of log to read, sanitise and write at a time
+LOG_CHUNK_SIZE = 1024 * 1024
+
+# Friendly names for the platforms returned by _detect_platform
+_PLATFORM_NAMES = {
+    'osx': 'OSX',
+    'ios': 'IOS',
+    'linux': 'Linux',
+    'windows': 'Windows',
+    'android': 'Android',
+    'elec': '*ELEC',
+    'unknown': 'Unknown',
+}
+
+
+def _detect_platform():
+    """
+    Work out which platform Kodi is running on.
+    Done just once, as each getCondVisibility call is a round trip into Kodi itself.
+
+    @return: one of the keys of _PLATFORM_NAMES
+    """
+    # *ELEC is Linux, but there we can be more specific about where crashlogs end up
+    if xbmc.getCondVisibility('System.HasAddon(service.coreelec.settings)') or xbmc.getCondVisibility('System.HasAddon(service.libreelec.settings)'):
+        return 'elec'
+    # Checked in order of precedence, first match wins
+    for platform in ['osx', 'ios', 'linux', 'windows', 'android']:
+        if xbmc.getCondVisibility(f'system.platform.{platform}'):
+            return platform
+    return 'unknown'
+
+
+_PLATFORM = _detect_platform()
+
+# Where to look for crashlogs on each platform, as (filematch, crashlog_path)
+# @TODO - add Android support if possible..?
+_CRASHLOG_LOCATIONS = {
+    'osx': ('Kodi', os.path.join(os.path.expanduser('~'), 'Library/Logs/DiagnosticReports/')),
+    'ios': ('Kodi', '/var/mobile/Library/Logs/CrashReporter/'),
+    # not 100% accurate (crashlogs can be created in the dir kodi was started from as well)
+    'linux': ('kodi_crashlog', os.path.expanduser('~')),
+    'windows': ('kodi_', LOG_PATH),
+    'elec': ('kodi_crashlog_', LOG_PATH),
+}
+
 
 def gather_log_files():
     """
@@ -24,76 +72,84 @@ def gather_log_files():
 
     # Basic log files
     log_files = [['log', os.path.join(LOG_PATH, 'kodi.log')]]
-    if os.path.exists(os.path.join(LOG_PATH, 'kodi.old.log')):
-        log_files.append(['oldlog', os.path.join(LOG_PATH, 'kodi.old.log')])
+    old_log = os.path.join(LOG_PATH, 'kodi.old.log')
+    if os.path.exists(old_log):
+        log_files.append(['oldlog', old_log])
 
     # Can we find a crashlog?
-    # @TODO - add Android support if possible..?
-    crashlog_path = ''
     items = []
-    filematch = None
-    if xbmc.getCondVisibility('system.platform.osx'):
-        Logger.info("System is OSX")
-        crashlog_path = os.path.join(os.path.expanduser('~'), 'Library/Logs/DiagnosticReports/')
-        filematch = 'Kodi'
-    elif xbmc.getCondVisibility('system.platform.ios'):
-        Logger.info("System is IOS")
-        crashlog_path = '/var/mobile/Library/Logs/CrashReporter/'
-        filematch = 'Kodi'
-    elif xbmc.getCondVisibility('system.platform.linux'):
-        Logger.info("System is Linux")
-        crashlog_path = os.path.expanduser('~')  # not 100% accurate (crashlogs can be created in the dir kodi was started from as well)
-        filematch = 'kodi_crashlog'
-    elif xbmc.getCondVisibility('system.platform.windows'):
-        Logger.info("System is Windows")
-        crashlog_path = LOG_PATH
-        filematch = 'kodi_'
-    elif xbmc.getCondVisibility('system.platform.android'):
-        Logger.info("System is Android")
+    Logger.info(f"System is {_PLATFORM_NAMES[_PLATFORM]}")
+    if _PLATFORM == 'android':
         Logger.info(LANGUAGE(32023))
-
-    # If *ELEC, we can be more specific
-    if xbmc.getCondVisibility('System.HasAddon(service.coreelec.settings)') or xbmc.getCondVisibility('System.HasAddon(service.libreelec.settings)'):
-        Logger.info("System is *ELEC")
-        crashlog_path = LOG_PATH
-        filematch = 'kodi_crashlog_'
+    filematch, crashlog_path = _CRASHLOG_LOCATIONS.get(_PLATFORM, (None, ''))
 
     if crashlog_path and os.path.isdir(crashlog_path):
         lastcrash = None
-        dirs, possible_crashlog_files = xbmcvfs.listdir(crashlog_path)
-        for item in possible_crashlog_files:
-            item_with_path = os.path.join(crashlog_path, item)
-            if filematch in item and os.path.isfile(item_with_path):
-                if filematch in item:
-                    # Don't bother with older crashlogs
-                    three_days_ago = datetime.now() - timedelta(days=3)
-                    if three_days_ago < datetime.fromtimestamp(os.path.getmtime(item_with_path)):
-                        items.append(os.path.join(crashlog_path, item))
-
-        items.sort(key=lambda f: os.path.getmtime(f))
+        # Don't bother with older crashlogs - work out the cutoff once, as a POSIX timestamp, to compare directly with the mtimes
+        cutoff_ts = (datetime.now() - timedelta(days=Store.crashlog_max_days)).timestamp()
+        # scandir provides each entry's type and stat info along with the directory listing, so each file is only stat'd once
+        with os.scandir(crashlog_path) as entries:
+            for entry in entries:
+                if filematch in entry.name and entry.is_file():
+                    mtime = entry.stat().st_mtime
+                    if mtime > cutoff_ts:
+                        items.append((mtime, entry.path))
+
         # Windows crashlogs are a dmp and stacktrace combo...
-        if xbmc.getCondVisibility('system.platform.windows'):
-            lastcrash = items[-2:]
-        else:
-            lastcrash = items[-1:]
+        newest = 2 if _PLATFORM == 'windows' else 1
+        # Only the newest one or two are wanted, so no need to sort them all.  (Kept oldest first)
+        lastcrash = [path for mtime, path in reversed(heapq.nlargest(newest, items))]
 
         if lastcrash:
             # Logger.info(f"lastcrash {lastcrash}")
             for crashfile in lastcrash:
                 log_files.append(['crashlog', crashfile])
 
-    Logger.info("Found these log files to copy:")
-    Logger.info(log_files)
+    Logger.info(f"Found these log files to copy: {log_files}")
 
     return log_files
 
 
+def copy_log_file(file: [], destination_path: str):
+    """
+    Copy a single log file to the destination folder, sanitising it on the way if it is a Kodi log
+
+    @param file: [type, path] of the log file to copy
+    @param destination_path: the folder to copy the log file to
+    @return: True if the file was copied, False otherwise
+    """
+    file_name = os.path.basename(file[1])
+    translated = xbmcvfs.translatePath(file[1])
+    if file[0] in ['log', 'oldlog']:
+        Logger.info(f'Copying sanitised {file[0]} {file[1]}')
+        # Stream the log through, in a single pass, in chunks of whole lines, so only a bounded slice of a (potentially very large)
+        # log is in memory.  This is all done on the raw bytes, so there's no decode/encode of the log, and no mangling of any
+        # odd encodings in it.  Chunks with nothing in them to sanitise are written out as is.
+        with open(translated, 'rb') as current, \
+                xbmcvfs.File(os.path.join(xbmcvfs.translatePath(destination_path), file_name), 'w') as output:
+            # Kodi (and the other copy threads, via the logger) keep appending to the live log, so copy it as it was when opened
+            snapshot_size = os.fstat(current.fileno()).st_size
+            while current.tell() < snapshot_size:
+                chunk = current.read(min(LOG_CHUNK_SIZE, snapshot_size - current.tell()))
+                if not chunk:
+                    break
+                # Finish off the last line (within the snapshot), so nothing to sanitise is split across chunks
+                if not chunk.endswith(b'\n'):
+                    chunk += current.readline(snapshot_size - current.tell())
+                if not output.write(clean_log(chunk)):
+                    return False
+            return True
+    else:
+        Logger.info(f'Copying {file[0]} {file[1]}')
+        return xbmcvfs.copy(file[1], os.path.join(destination_path, file_name))
+
+
 def copy_log_files(log_files: []):
     """
     Actually copy the log files to the path in the addon settings
 
     @param log_files: [] list of log files to copy
-    @return: None
+    @return: True if all the log files were copied, False otherwise
     """
     if not log_files:
         Logger.error(LANGUAGE(32025))
@@ -106,19 +162,10 @@ def copy_log_files(log_files: []):
     try:
         Logger.info(f'Making destination folder: {now_destination_path}')
         xbmcvfs.mkdir(now_destination_path)
-        for file in log_files:
-            if file[0] in ['log', 'oldlog']:
-                Logger.info(f'Copying sanitised {file[0]} {file[1]}')
-                with open(xbmcvfs.translatePath(file[1]), 'r', encoding='utf-8') as current:
-                    content = current.read()
-                    sanitised = clean_log(content)
-                with xbmcvfs.File(os.path.join(xbmcvfs.translatePath(now_destination_path),os.path.basename(file[1])), 'w') as output:
-                    output.write(sanitised)
-            else:
-                Logger.info(f'Copying {file[0]} {file[1]}')
-                if not xbmcvfs.copy(file[1], os.path.join(now_destination_path, os.path.basename(file[1]))):
-                    return False
-        return True
+        # Each file is read and written independently, so copy them all at once, overlapping the (mostly I/O) work.
+        # Every copy runs to completion; the result is only True if all of them succeeded.
+        with ThreadPoolExecutor(max_workers=len(log_files)) as executor:
+            return all(list(executor.map(partial(copy_log_file, destination_path=now_destination_path), log_files)))
 
     except Exception as e:
         Logger.error(LANGUAGE(32026) + f": {str(e)}")
@@ -1,15 +1,93 @@
-import re
+from functools import lru_cache
+
+# Prefer RE2 (linear time matching, regardless of input) where available, falling back to the standard library re
+try:
+    import re2 as _re
+except ImportError:
+    import re as _re
+
+# URL credentials (//user:password@) genuinely need a regex, compiled once at import.
+# Neither character class includes '/', so each attempt stops at the next '/' and the scan stays linear.
+_CREDENTIALS = _re.compile(r'//[^/:\s]+:[^/\s]+@')
+# ...and the same for raw (undecoded) log bytes
+_CREDENTIALS_BYTES = _re.compile(rb'//[^/:\s]+:[^/\s]+@')
+
+
+def _strip_tag(content, open_tag, close_tag, replacement):
+    """
+    Replace the contents of each open_tag...close_tag pair (that has no other tag within it) with replacement.
+    The tags are fixed literals, so plain string searching does this without a regex.
+    Works equally on str or bytes, as long as all the arguments are of the same type.
+
+    @param content: the string to sanitise
+    @param open_tag: e.g. '<user>'
+    @param close_tag: e.g. '</user>'
+    @param replacement: the text to put between the tags
+    @return: the sanitised string
+    """
+    out = []
+    pos = 0
+    while True:
+        start = content.find(open_tag, pos)
+        if start == -1:
+            break
+        inner_start = start + len(open_tag)
+        end = content.find(close_tag, inner_start)
+        if end == -1:
+            break
+        if content.find(open_tag[:1], inner_start, end) != -1:
+            # Not a simple <tag>value</tag>, leave it be
+            out.append(content[pos:inner_start])
+            pos = inner_start
+            continue
+        out.append(content[pos:inner_start])
+        out.append(replacement)
+        out.append(close_tag)
+        pos = end + len(close_tag)
+
+    if not out:
+        return content
+    out.append(content[pos:])
+    return content[:0].join(out)
 
 
 def clean_log(content):
     """
-    Remove username/password details from log file content
+    Remove username/password details from log file content, given as a str or as raw (undecoded) bytes
+
+    With RE2 available, matching URL credentials is guaranteed linear in the length of the content.
+    With the standard re module (a backtracking matcher), the pattern's character classes exclude '/', so each match attempt
+    ends at the next '/' and the worst case stays linear in practice.
 
-    @param content:
-    @return:
+    @param content: the log content (or any string) to sanitise, str or bytes
+    @return: the sanitised content, of the same type
     """
-    replaces = (('//.+?:.+?@', '//USER:PASSWORD@'), ('<user>.+?</user>', '<user>USER</user>'), ('<pass>.+?</pass>', '<pass>PASSWORD</pass>'),)
+    # The pattern and literals used just need to be the same type as the content
+    if isinstance(content, bytes):
+        credentials, literal = _CREDENTIALS_BYTES, str.encode
+    else:
+        credentials, literal = _CREDENTIALS, str
+
+    # Every match needs an '@' or a '<', so most short strings (e.g. paths with no credentials) can return straight away
+    if literal('@') not in content and literal('<') not in content:
+        return content
+    # None of these can match without the literals checked for, and a substring test is far cheaper than a scan
+    if literal('@') in content and literal('//') in content:
+        content = credentials.sub(literal('//USER:PASSWORD@'), content)
+    if literal('<user>') in content:
+        content = _strip_tag(content, literal('<user>'), literal('</user>'), literal('USER'))
+    if literal('<pass>') in content:
+        content = _strip_tag(content, literal('<pass>'), literal('</pass>'), literal('PASSWORD'))
+    return content
+
 
-    for pattern, repl in replaces:
-        sanitised = re.sub(pattern, repl, content)
-        return sanitised
+@lru_cache(maxsize=16)
+def clean_path(path):
+    """
+    Remove username/password details from a short string such as a path/URL, caching the result.
+    (Don't use this for log content - that is large and unique, so caching it would just waste memory)
+
+    @param path: the path to sanitise
+    @return: the sanitised path
+    """
+    return clean_log(path)
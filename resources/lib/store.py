@@ -14,6 +14,8 @@ class Store:
     # Static class variables, referred to elsewhere by Store.whatever
     # https://docs.python.org/3/faq/programming.html#how-do-i-create-static-class-data-and-static-class-methods
     destination_path = None
+    # Crashlogs older than this are not copied
+    crashlog_max_days = 3
 
     def __init__(self):
         """
@@ -30,7 +32,7 @@ class Store:
         Logger.info("Loading configuration from settings")
         Store.destination_path = ADDON.getSetting('log_path')
 
-        Logger.info(f'Logs will be tossed to: {clean_log(Store.destination_path)}')
+        Logger.info(f'Logs will be tossed to: {clean_path(Store.destination_path)}')
 
 
 